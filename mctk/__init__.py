@@ -1,10 +1,11 @@
 from .models import KripkeStruct, KripkeStructError
-from .checking import SAT_atom, NOT, AND, OR, IMPLIES, IFF, EX, AX, EF, AF, EG, AG, EU, AU
+from .checking import SAT, SAT_atom, NOT, AND, OR, IMPLIES, IFF, EX, AX, EF, AF, EG, AG, EU, AU
 
 __version__ = "0.1.1"
 __all__ = [
     "KripkeStruct",
     "KripkeStructError",
+    "SAT",
     "SAT_atom",
     "NOT",
     "AND",
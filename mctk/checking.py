@@ -49,12 +49,15 @@ Examples:
 
 
 # Standard Libraries
-from copy import deepcopy
-from typing import Set
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
 
 # Internal Modules
 from .models import KripkeStruct, KripkeStructError
 
+# the Model Checking algorithms are friends of KripkeStruct, they read its cached State Masks directly
+# pylint: disable=protected-access
+
 
 def SAT_atom(ks: KripkeStruct, atomic_property: str) -> Set[str]:
     """Evaluate an atomic propositional property on a Kripke Structure.
@@ -72,25 +75,8 @@ def SAT_atom(ks: KripkeStruct, atomic_property: str) -> Set[str]:
         KripkeStructError: if the Atomic Property is not in the Kripke Structure
 
     """
-    sat_states = set()
-    state_names = ks.get_state_names()
-
-    if atomic_property == "True":
-        return state_names
-    if atomic_property == "False":
-        return set()
-    if atomic_property not in ks.get_atoms():
-        raise KripkeStructError("Can't check on an atom that's not in the Kripke Structure")
-
-    for state in state_names:
-        # get the Label for the State Name, which is a set of atoms
-        label = ks.get_label_of_state(state)
-
-        # if the atomic property is in the Label, then this state satisfies the atomic property
-        if atomic_property in label:
-            sat_states.add(state)
-
-    return sat_states
+    ks._ensure_masks()
+    return ks._to_states(_SAT_atom(ks, atomic_property))
 
 
 def NOT(ks: KripkeStruct, property1: Set[str]) -> Set[str]:
@@ -106,8 +92,8 @@ def NOT(ks: KripkeStruct, property1: Set[str]) -> Set[str]:
         a set of states where the CTL formula "NOT property" is satisfied
 
     """
-    # complement of the set
-    return ks.get_state_names() - property1
+    ks._ensure_masks()
+    return ks._to_states(_NOT(ks, ks._to_mask(property1)))
 
 
 def AND(property1: Set[str], property2: Set[str]) -> Set[str]:
@@ -160,9 +146,8 @@ def IMPLIES(ks: KripkeStruct, property1: Set[str], property2: Set[str]) -> Set[s
         a set of states where the CTL formula "property1 IMPLIES property2" is satisfied
 
     """
-    # complement of property1, then union property2
-    # p IMPLIES q = NOT(p) OR q
-    return NOT(ks, property1) | property2
+    ks._ensure_masks()
+    return ks._to_states(_IMPLIES(ks, ks._to_mask(property1), ks._to_mask(property2)))
 
 
 def IFF(ks: KripkeStruct, property1: Set[str], property2: Set[str]) -> Set[str]:
@@ -179,8 +164,8 @@ def IFF(ks: KripkeStruct, property1: Set[str], property2: Set[str]) -> Set[str]:
         a set of states where the CTL formula "property1 IFF property2" is satisfied
 
     """
-    # (p IFF q) = (p IMPLIES q) AND (q IMPLIES p)
-    return IMPLIES(ks, property1, property2) & IMPLIES(ks, property2, property1)
+    ks._ensure_masks()
+    return ks._to_states(_IFF(ks, ks._to_mask(property1), ks._to_mask(property2)))
 
 
 def EX(ks: KripkeStruct, property1: Set[str]) -> Set[str]:
@@ -196,18 +181,8 @@ def EX(ks: KripkeStruct, property1: Set[str]) -> Set[str]:
         a set of states where the CTL formula "EX property" is satisfied
 
     """
-    sat_states = set()
-
-    for state in ks.get_states():
-        # get the successors of the state
-        successors = ks.get_trans()[state]
-
-        for successor in successors:
-            # test if the successors satisfy the property
-            if successor in property1:
-                sat_states.add(state)
-
-    return sat_states
+    ks._ensure_masks()
+    return ks._to_states(_EX(ks, ks._to_mask(property1)))
 
 
 def AX(ks: KripkeStruct, property1: Set[str]) -> Set[str]:
@@ -223,8 +198,8 @@ def AX(ks: KripkeStruct, property1: Set[str]) -> Set[str]:
         a set of states where the CTL formula "AX property" is satisfied
 
     """
-    # AX p = NOT (EX NOT(p))
-    return NOT(ks, EX(ks, NOT(ks, property1)))
+    ks._ensure_masks()
+    return ks._to_states(_AX(ks, ks._to_mask(property1)))
 
 
 def EU(ks: KripkeStruct, property1: Set[str], property2: Set[str]) -> Set[str]:
@@ -241,31 +216,8 @@ def EU(ks: KripkeStruct, property1: Set[str], property2: Set[str]) -> Set[str]:
         a set of states where the CTL formula "E property1 U property2" is satisfied
 
     """
-    # if a state satisfies property2, then it satisfies "E property1 U property2" by definition
-    # therefore we intialize set_stats to be property2
-    sat_states = property2
-    size = len(sat_states)
-
-    # we keep adding states that can reach "sat_states" in 1 step, and also satisfy property1
-    # until we reach a fixed point
-    # i.e. no new states are added to "sat_states"
-    # i.e. size of "sat_states" does not change
-    while True:
-        # get the predecessors of all states in "sat_states"
-        predecessors = set()
-        for state in sat_states:
-            predecessors = predecessors | ks.get_trans_inverted()[state]
-
-        # add states that can reach "sat_states" in 1 step, and also satisfy property1
-        sat_states = sat_states | (property1 & predecessors)
-
-        # if no new states are added, then we have reached a fixed point
-        new_size = len(sat_states)
-        if new_size == size:
-            break
-        size = new_size
-
-    return sat_states
+    ks._ensure_masks()
+    return ks._to_states(_EU(ks, ks._to_mask(property1), ks._to_mask(property2)))
 
 
 def EF(ks: KripkeStruct, property1: Set[str]) -> Set[str]:
@@ -281,8 +233,8 @@ def EF(ks: KripkeStruct, property1: Set[str]) -> Set[str]:
         a set of states where the CTL formula "EF property" is satisfied
 
     """
-    # EF p = E true U p
-    return EU(ks, ks.get_state_names(), property1)
+    ks._ensure_masks()
+    return ks._to_states(_EF(ks, ks._to_mask(property1)))
 
 
 def AG(ks: KripkeStruct, property1: Set[str]) -> Set[str]:
@@ -298,8 +250,8 @@ def AG(ks: KripkeStruct, property1: Set[str]) -> Set[str]:
         a set of states where the CTL formula "AG property" is satisfied
 
     """
-    # AG p = NOT (EF NOT(p))
-    return NOT(ks, EF(ks, NOT(ks, property1)))
+    ks._ensure_masks()
+    return ks._to_states(_AG(ks, ks._to_mask(property1)))
 
 
 def EG(ks: KripkeStruct, property1: Set[str]) -> Set[str]:
@@ -315,50 +267,8 @@ def EG(ks: KripkeStruct, property1: Set[str]) -> Set[str]:
         a set of states where "EG property" is satisfied
 
     """
-    sat_states = set()
-
-    # creat a sub-graph of the original Kripke Structure ks
-    # where we remove all states that do not satisfy property
-    # since we need to modify the reversed graph, we create a deepcopy of self
-    sub_graph = deepcopy(ks)
-    for state in ks.get_states():
-        if state not in property1:
-            sub_graph.remove_state(state)
-
-    # compute all Strongly Connected Components (SCCs) of the sub-graph
-    # SCCs is a set of SCCs, where each SCC is a set of states
-    SCCs = sub_graph.get_SCCs()
-
-    # add all non-trivial SCCs to sat_states
-    for SCC in SCCs:
-        if len(SCC) > 1:
-            sat_states = sat_states | SCC
-
-    # if there are no non-trivial SCCs, then no states satisfy EG property
-    if not sat_states:
-        return sat_states
-
-    # otherwise, we keep adding states that can reach "sat_states" in 1 step
-    # until we reach a fixed point
-    # i.e. no new states are added to "sat_states"
-    # i.e. size of "sat_states" does not change
-    size = len(sat_states)
-    while True:
-        # get the predecessors of all states in "sat_states"
-        predecessors = set()
-        for state in sat_states:
-            predecessors = predecessors | sub_graph.get_trans_inverted()[state]
-
-        # add states that can reach "sat_states" in 1 step
-        sat_states = sat_states | predecessors
-
-        # if no new states are added, then we have reached a fixed point
-        new_size = len(sat_states)
-        if new_size == size:
-            break
-        size = new_size
-
-    return sat_states
+    ks._ensure_masks()
+    return ks._to_states(_EG(ks, ks._to_mask(property1)))
 
 
 def AF(ks: KripkeStruct, property1: Set[str]) -> Set[str]:
@@ -374,8 +284,8 @@ def AF(ks: KripkeStruct, property1: Set[str]) -> Set[str]:
         a set of states where the CTL formula "AF property" is satisfied
 
     """
-    # AF p = NOT (EG NOT(p))
-    return NOT(ks, EG(ks, NOT(ks, property1)))
+    ks._ensure_masks()
+    return ks._to_states(_AF(ks, ks._to_mask(property1)))
 
 
 def AU(ks: KripkeStruct, property1: Set[str], property2: Set[str]) -> Set[str]:
@@ -392,8 +302,270 @@ def AU(ks: KripkeStruct, property1: Set[str], property2: Set[str]) -> Set[str]:
         a set of states where the CTL formula "A property1 U property2" is satisfied
 
     """
+    ks._ensure_masks()
+    return ks._to_states(_AU(ks, ks._to_mask(property1), ks._to_mask(property2)))
+
+
+def SAT(ks: KripkeStruct, formula: Union[str, Tuple]) -> Set[str]:
+    """Evaluate a (composite) CTL formula on a Kripke Structure.
+
+    Return a set of states where the CTL formula is satisfied.
+    A CTL formula is either an Atom (including "True" and "False") represented as a string,
+    or a tuple whose first element is the name of an operator, followed by its operand formulas.
+    For example, "EX (p AND EX q)" is represented as ("EX", ("AND", "p", ("EX", "q"))).
+
+    The formula is compiled once into a straight-line program, which is cached for later calls.
+    Each distinct sub-formula is evaluated only once per call, even if it appears multiple times,
+    since equal sub-formulas are equal tuples, and they share 1 instruction.
+    The results of the 128 most recently used sub-formulas are also cached in the Kripke Structure until it is modified,
+    so checking formulas that share sub-formulas on the same Kripke Structure doesn't evaluate them again.
+
+    Args:
+        ks: a Kripke Structure
+        formula: a CTL formula represented as a string or a nested tuple
+
+    Returns:
+        a set of states where the CTL formula is satisfied
+
+    Raises:
+        KripkeStructError: if an Atom is not in the Kripke Structure
+        KripkeStructError: if an operator is unknown, or has the wrong number of operands
+        KripkeStructError: if a (sub-)formula is neither a string nor a tuple
+
+    """
+    ks._ensure_masks()
+    return ks._to_states(_SAT(ks, formula))
+
+
+# The following functions implement the CTL operators on State Masks,
+# where a set of states is represented as an int, see KripkeStruct._build_masks()
+# the caller is responsible for calling ks._ensure_masks() beforehand
+def _SAT_atom(ks: KripkeStruct, atomic_property: str) -> int:
+    # the State Mask of each Atom is precomputed, so this is a dict lookup
+    if atomic_property == "True":
+        return ks._all_mask
+    if atomic_property == "False":
+        return 0
+    if atomic_property not in ks._atoms_set:
+        raise KripkeStructError("Can't check on an atom that's not in the Kripke Structure")
+    return ks._atom_masks[atomic_property]
+
+
+def _NOT(ks: KripkeStruct, mask1: int) -> int:
+    # complement of the set
+    return ks._all_mask & ~mask1
+
+
+def _AND(_ks: KripkeStruct, mask1: int, mask2: int) -> int:
+    # intersection of the two sets, "_ks" is unused but keeps the calling convention of "_OPERATORS"
+    return mask1 & mask2
+
+
+def _OR(_ks: KripkeStruct, mask1: int, mask2: int) -> int:
+    # union of the two sets, "_ks" is unused but keeps the calling convention of "_OPERATORS"
+    return mask1 | mask2
+
+
+def _IMPLIES(ks: KripkeStruct, mask1: int, mask2: int) -> int:
+    # complement of property1, then union property2
+    # p IMPLIES q = NOT(p) OR q
+    return _NOT(ks, mask1) | mask2
+
+
+def _IFF(ks: KripkeStruct, mask1: int, mask2: int) -> int:
+    # (p IFF q) = (p IMPLIES q) AND (q IMPLIES p) = NOT (p XOR q)
+    return ks._all_mask & ~(mask1 ^ mask2)
+
+
+def _EX(ks: KripkeStruct, mask1: int) -> int:
+    # a state satisfies "EX property" iff it's a predecessor of a state that satisfies property
+    # so we OR together the Predecessor Masks of all states that satisfy property,
+    # which is a boolean sparse matrix-vector product of the transposed adjacency matrix and the State Mask
+    # the bit iteration is inlined and everything is bound to locals, since this is the hottest loop
+    pred_masks = ks._pred_masks
+    sat_mask = 0
+    while mask1:
+        lowest = mask1 & -mask1
+        sat_mask |= pred_masks[lowest.bit_length() - 1]
+        mask1 ^= lowest
+    return sat_mask
+
+
+def _backward_closure(ks: KripkeStruct, seed_mask: int, restrict_mask: int) -> int:
+    # the fixed point kernel shared by EU and EG:
+    # keep adding states in "restrict_mask" that can reach "sat_mask" in 1 step,
+    # until we reach a fixed point, i.e. no new state is added
+    # since "sat_mask" only grows, only the newly added states (the frontier) can contribute new predecessors
+    # if every state in "restrict_mask" is already in "seed_mask", e.g. "seed_mask" is all states, nothing can be added
+    if not restrict_mask & ~seed_mask:
+        return seed_mask
+
+    sat_mask = seed_mask
+    frontier = seed_mask
+    while frontier:
+        frontier = restrict_mask & _EX(ks, frontier) & ~sat_mask
+        sat_mask |= frontier
+    return sat_mask
+
+
+def _AX(ks: KripkeStruct, mask1: int) -> int:
+    # AX p = NOT (EX NOT(p)), i.e. a state satisfies "AX property" iff none of its successors violates property
+    # fused into 1 pass: OR together the Predecessor Masks of all states that violate property, then complement
+    all_mask = ks._all_mask
+    pred_masks = ks._pred_masks
+    violate_mask = all_mask & ~mask1
+    pred_mask = 0
+    while violate_mask:
+        lowest = violate_mask & -violate_mask
+        pred_mask |= pred_masks[lowest.bit_length() - 1]
+        violate_mask ^= lowest
+    return all_mask & ~pred_mask
+
+
+def _EU(ks: KripkeStruct, mask1: int, mask2: int) -> int:
+    # if a state satisfies property2, then it satisfies "E property1 U property2" by definition
+    # therefore we intialize sat_mask to be property2
+    sat_mask = mask2
+
+    # then we keep adding states that can reach "sat_mask" in 1 step, and also satisfy property1
+    return _backward_closure(ks, sat_mask, mask1)
+
+
+def _EF(ks: KripkeStruct, mask1: int) -> int:
+    # EF p = E true U p
+    return _EU(ks, ks._all_mask, mask1)
+
+
+def _AG(ks: KripkeStruct, mask1: int) -> int:
+    # AG p = NOT (EF NOT(p))
+    return _NOT(ks, _EF(ks, _NOT(ks, mask1)))
+
+
+def _EG_seeds(ks: KripkeStruct, mask1: int) -> int:
+    # the states of all non-trivial SCCs of the sub-graph restricted to property,
+    # i.e. the states where "EG property" holds by staying in the same SCC forever
+    # if no state that satisfies property has a successor that satisfies property,
+    # every path leaves property in 1 step, so there is no non-trivial SCC, and we can skip the SCCs
+    if not mask1 & _EX(ks, mask1):
+        return 0
+
+    # restrict the graph to the states that satisfy property, without copying it
+    # then compute all Strongly Connected Components (SCCs) of the sub-graph
+    pred_masks = ks._pred_masks
+
+    # a SCC is non-trivial if it has more than 1 state, or its only state has a self-loop
+    seed_mask = 0
+    for SCC_mask in ks._get_SCC_masks(mask1):
+        if SCC_mask & (SCC_mask - 1) or pred_masks[SCC_mask.bit_length() - 1] & SCC_mask:
+            seed_mask |= SCC_mask
+    return seed_mask
+
+
+def _EG(ks: KripkeStruct, mask1: int) -> int:
+    # start from all non-trivial SCCs, then we keep adding states that can reach "sat_mask" in 1 step
+    # since the sub-graph only contains states that satisfy property, we restrict predecessors to property
+    return _backward_closure(ks, _EG_seeds(ks, mask1), mask1)
+
+
+def _AF(ks: KripkeStruct, mask1: int) -> int:
+    # AF p = NOT (EG NOT(p))
+    return _NOT(ks, _EG(ks, _NOT(ks, mask1)))
+
+
+def _AU(ks: KripkeStruct, mask1: int, mask2: int) -> int:
     # A p1 U p2 = NOT (E NOT(p2) U (NOT(p1) AND NOT(p2))) AND NOT (EG NOT(p2))
     #           = NOT (E NOT(p2) U (NOT(p1) AND NOT(p2))) AND AF p2
-    return NOT(ks, EU(ks, NOT(ks, property2), NOT(ks, property1) & NOT(ks, property2))) & NOT(
-        ks, EG(ks, NOT(ks, property2))
-    )
+    # both EU and EG are backward closures restricted to NOT(p2), and a backward closure distributes over union,
+    # so we run a single closure from the union of their seeds, instead of 2 separate fixed points
+    not_mask2 = _NOT(ks, mask2)
+    seed_mask = (_NOT(ks, mask1) & not_mask2) | _EG_seeds(ks, not_mask2)
+    return _NOT(ks, _backward_closure(ks, seed_mask, not_mask2))
+
+
+# map the name of each operator to its implementation on State Masks, and its number of operands
+_OPERATORS: Dict[str, Tuple[Callable[..., int], int]] = {
+    "NOT": (_NOT, 1),
+    "AND": (_AND, 2),
+    "OR": (_OR, 2),
+    "IMPLIES": (_IMPLIES, 2),
+    "IFF": (_IFF, 2),
+    "EX": (_EX, 1),
+    "AX": (_AX, 1),
+    "EU": (_EU, 2),
+    "EF": (_EF, 1),
+    "AG": (_AG, 1),
+    "EG": (_EG, 1),
+    "AF": (_AF, 1),
+    "AU": (_AU, 2),
+}
+
+
+# the maximum number of (sub-)formulas whose results are cached in a Kripke Structure, see _SAT()
+_SAT_CACHE_SIZE = 128
+
+# an instruction of a compiled formula, see _compile()
+# the operands are the positions of the operand instructions, or the Atom itself if the function is None
+_Instruction = Tuple[Union[str, Tuple], Optional[Callable[..., int]], Any]
+
+
+@lru_cache(maxsize=128)
+def _compile(formula: Union[str, Tuple]) -> Tuple[_Instruction, ...]:
+    # compile the formula into a straight-line program, so that repeated checks of it skip the parsing
+    # each instruction is (sub-formula, function, operand positions), or (atom, None, atom) for an Atom
+    # the instructions are in post-order, and each distinct sub-formula has exactly 1 instruction
+    program: List[_Instruction] = []
+    positions: Dict[Union[str, Tuple], int] = {}
+
+    def emit(node: Union[str, Tuple]) -> int:
+        if node in positions:
+            return positions[node]
+
+        instruction: _Instruction
+        if isinstance(node, str):
+            instruction = (node, None, node)
+        else:
+            # a sub-formula must be an Atom, or a tuple of an operator followed by its operands
+            if not isinstance(node, tuple) or not node:
+                raise KripkeStructError("Can't check a formula that's not a string or a nested tuple")
+            operator, *operands = node
+            if operator not in _OPERATORS:
+                raise KripkeStructError(f"Can't check a formula with an unknown operator: {operator}")
+            function, arity = _OPERATORS[operator]
+            if len(operands) != arity:
+                raise KripkeStructError(f"The operator {operator} should have {arity} operand(s)")
+            instruction = (node, function, tuple(emit(operand) for operand in operands))
+
+        positions[node] = len(program)
+        program.append(instruction)
+        return positions[node]
+
+    emit(formula)
+    return tuple(program)
+
+
+def _SAT(ks: KripkeStruct, formula: Union[str, Tuple]) -> int:
+    # run the compiled program on a stack of State Masks, the last one is the result of the whole formula
+    # a sub-formula is only evaluated if its result is not cached yet, the cache is cleared by ks._build_masks()
+    # a formula is the key of the compiled program cache, so it must be hashable, e.g. not a list
+    try:
+        hash(formula)
+    except TypeError as error:
+        raise KripkeStructError("Can't check a formula that's not a string or a nested tuple") from error
+
+    # the cache is a LRU cache, so that it keeps at most "_SAT_CACHE_SIZE" State Masks
+    cache = ks._SAT_cache
+    masks: List[int] = []
+    for subformula, function, operands in _compile(formula):
+        mask = cache.get(subformula)
+        if mask is None:
+            if function is None:
+                mask = _SAT_atom(ks, operands)
+            else:
+                mask = function(ks, *(masks[i] for i in operands))
+            cache[subformula] = mask
+            if len(cache) > _SAT_CACHE_SIZE:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(subformula)
+        masks.append(mask)
+    return masks[-1]
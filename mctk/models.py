@@ -7,16 +7,34 @@ We plan to support other Transition Systems as well in the future.
 """
 
 # Standard Libraries
-from typing import List, Dict, Set, Tuple
-from collections import defaultdict, UserDict
-from copy import deepcopy
+from typing import List, Dict, Set, FrozenSet, Tuple, Iterable, Iterator, Mapping, Optional
+from collections import defaultdict, OrderedDict, UserDict
+from types import MappingProxyType
+from sys import intern
+
+
+def _iter_bits(mask: int) -> Iterator[int]:
+    """Yield the positions of all 1 bits in a non-negative int, from the lowest to the highest."""
+    while mask:
+        # isolate the lowest 1 bit, its position is its bit_length minus 1
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+def _intern(name: str) -> str:
+    """Intern a State Name or an Atom, names that "sys.intern" rejects (e.g. not a str) are returned as they are."""
+    try:
+        return intern(name)
+    except TypeError:
+        return name
 
 
 class KripkeStructError(Exception):
     """Exceptions raised by methods related to class KripkeStruct."""
 
 
-class KripkeStruct:
+class KripkeStruct:  # pylint: disable=too-many-instance-attributes,too-many-public-methods
     """Class that implements a Kripke Structure for Model Checking.
 
     An instance of thie class can be created from a JSON file or from scratch.
@@ -26,21 +44,70 @@ class KripkeStruct:
     Attributes:
         _atoms (tuple): Atoms, can only be reset before any state is created
         _atoms_set (set): Atoms, a duplicate of "_atoms", only for efficiency
+        _atom_bits (dict): Key is the Atom, Value is the bit that stands for it in a State Label
         _states (_UniqueValueDict): States, Key is the state name, Value is the state label
         _starts (set): Start States
         _trans (defaultdict): Transitions, Key is the source state, Value is a set of target states
         _trans_inverted (defaultdict): Inverted Transitions, Key is the target state, Value is a set of source states
+        _state_ids (dict): State Indices, Key is the State Name, Value is the bit position used in State Masks
+        _state_names (tuple): State Names, indexed by the bit position used in State Masks
+        _all_mask (int): State Mask with one bit set for every State
+        _atom_masks (dict): Atom Masks, Key is the Atom, Value is the State Mask of all States labeled with it
+        _pred_masks (list): Predecessor Masks, the i-th one is the State Mask of all predecessors of the i-th State
+        _succ_indptr (list): CSR row pointers, the i-th State has successors "_succ_indices[indptr[i]:indptr[i+1]]"
+        _succ_indices (list): CSR column indices, the State Indices of all successors, grouped by source State
+        _SCC_masks (list): State Masks of all SCCs of the whole Kripke Structure, None if not computed yet
+        _SAT_cache (OrderedDict): Key is a CTL (sub-)formula, Value is the State Mask where it's satisfied,
+            filled by SAT, and ordered from the least to the most recently used
+        _dirty (bool): whether the cached State Indices and State Masks need to be rebuilt,
+            after Atoms or Transitions change
+            changes of States, including assignments with "_states[...]", are tracked by "_states.modified"
 
     """
 
+    # no per-instance __dict__, which saves memory and speeds up attribute access in the Model Checking algorithms
+    __slots__ = (
+        "_atoms",
+        "_atoms_set",
+        "_atom_bits",
+        "_states",
+        "_starts",
+        "_trans",
+        "_trans_inverted",
+        "_state_ids",
+        "_state_names",
+        "_all_mask",
+        "_atom_masks",
+        "_pred_masks",
+        "_succ_indptr",
+        "_succ_indices",
+        "_SCC_masks",
+        "_SAT_cache",
+        "_dirty",
+    )
+
     def __init__(self, model_json=None):
         self._atoms = ()
         self._atoms_set = set()
+        self._atom_bits = {}
         self._states = self._KripkeStateDict()
         self._starts = set()
         self._trans = defaultdict(set)
         self._trans_inverted = defaultdict(set)
 
+        # cached State Indices and State Masks, rebuilt lazily after any mutation
+        # a State Mask is an int, where the i-th bit is 1 iff the State "_state_names[i]" is in the set
+        self._state_ids = {}
+        self._state_names = ()
+        self._all_mask = 0
+        self._atom_masks = {}
+        self._pred_masks = []
+        self._succ_indptr = [0]
+        self._succ_indices = []
+        self._SCC_masks = None
+        self._SAT_cache = OrderedDict()
+        self._dirty = False
+
         if model_json is not None:
             self.set_atoms(model_json["Atoms"])
             self.add_states(model_json["States"])
@@ -50,6 +117,10 @@ class KripkeStruct:
     class _KripkeStateDict(UserDict):
         def __init__(self, atoms_num: int = 0):
             self.atoms_num = atoms_num
+            # all State Labels in use, so that checking if a State Label exists is O(1)
+            self.labels: Set[int] = set()
+            # whether any State is added, removed or relabeled since the cached State Masks were built
+            self.modified = False
             super().__init__()
 
         def __setitem__(self, key, value):
@@ -67,10 +138,38 @@ class KripkeStruct:
 
             # if the value is already assigned to a different key, raise an error
             # no matter if the key exists or not
-            if value in self.values():
+            if value in self.labels:
                 raise KripkeStructError("Can't assign an existing State Label to a different State Name")
 
+            # if the key exists, its old value is no longer in use
+            if key in self:
+                self.labels.discard(self.__getitem__(key))
             super().__setitem__(key, value)
+            self.labels.add(value)
+            self.modified = True
+
+        def __copy__(self):
+            """Copy the States together with the State Labels in use, without validating them again."""
+            states = type(self)(self.atoms_num)
+            states.data = dict(self.data)
+            states.labels = set(self.labels)
+            states.modified = self.modified
+            return states
+
+        copy = __copy__
+
+        def set_validated(self, key, value):
+            """Assign a State Label that the caller has already validated, skipping the checks in __setitem__."""
+            if key in self.data:
+                self.labels.discard(self.data[key])
+            self.data[key] = value
+            self.labels.add(value)
+            self.modified = True
+
+        def __delitem__(self, key):
+            self.labels.discard(self.__getitem__(key))
+            super().__delitem__(key)
+            self.modified = True
 
     def __str__(self) -> str:
         return (
@@ -97,10 +196,19 @@ class KripkeStruct:
         # if any state exists, can't reset atoms
         if self._states:
             raise KripkeStructError("Can't reset Atoms after States are Created")
+
+        # intern the Atoms, so that all containers share 1 string object for each of them
+        atoms = [_intern(atom) for atom in atoms]
         self._atoms = tuple(atoms)
         self._atoms_set = set(atoms)
         self._states.atoms_num = len(atoms)
 
+        # for example, if the atoms are ("a", "b", "c", "d"), then the bit of "a" is 0b1000, and "d" is 0b0001
+        self._atom_bits = {atom: 1 << (len(atoms) - 1 - i) for i, atom in enumerate(atoms)}
+
+        # the cached Atom Masks and the results of CTL formulas depend on the Atoms
+        self._dirty = True
+
     def get_atoms(self) -> Tuple[str]:
         """Get Atoms of the Kripke Structure.
 
@@ -134,34 +242,28 @@ class KripkeStruct:
         if state in self._states:
             raise KripkeStructError("Can't add an Existing State Name again")
 
-        # convert the label to a set, for efficiency,
-        # since we'll check if each atom in "self._atoms" is in "label" later
-        label_set = set(label)
-
-        # if the State Label contains a Non-Eixsting Atom, can't add it
-        for atom in label_set:
-            if atom not in self._atoms_set:
-                raise KripkeStructError("Can't add a State Label with a Non-Existing Atom")
+        # intern the State Name, so that all containers share 1 string object for it,
+        # and dict lookups can compare State Names by identity
+        state = _intern(state)
 
         # convert the label to its binary representation, to save memory
         # for example, if the atoms are ("a", "b", "c", "d"), and the label is ["a", "c"],
         # then the binary representation is 0b1010, which is the int 10 in decimal
+        # only the atoms in "label" are visited, instead of all atoms in "self._atoms"
+        atom_bits = self._atom_bits
         label_binary = 0b0
-        for atom in self._atoms:
-            # if an Atom is in "label", set the corresponding bit to 1
-            if atom in label_set:
-                label_binary |= 0b1
-            # left shift by 1 bit
-            label_binary <<= 1
-
-        # correct the extra left shift
-        label_binary >>= 1
+        for atom in label:
+            # if the State Label contains a Non-Eixsting Atom, can't add it
+            if atom not in atom_bits:
+                raise KripkeStructError("Can't add a State Label with a Non-Existing Atom")
+            label_binary |= atom_bits[atom]
 
         # if the state label exists, can't add again
-        if label_binary in self._states.values():
+        if label_binary in self._states.labels:
             raise KripkeStructError("Can't add an Existing State Label again")
 
-        self._states[state] = label_binary
+        # the State Label is already validated above, so the checks in "_states[...]" are skipped
+        self._states.set_validated(state, label_binary)
 
     def add_states(self, states: Dict[str, List[str]]) -> None:
         """Add multiple States to the Kripke Structure.
@@ -171,23 +273,51 @@ class KripkeStruct:
 
         Raises:
             KripkeStructError: if a State Name or a State Label exists, can't add again
+            KripkeStructError: if a State Label contains a Non-Existing Atom, can't add it
+
+        Note:
+            All States are validated before any of them is added,
+            so if an error is raised, the Kripke Structure is left unchanged.
 
         """
-        for state, label in states.items():
-            self.add_state(state, label)
+        # if any State Name exists, can't add again
+        if not self._states.data.keys().isdisjoint(states):
+            raise KripkeStructError("Can't add an Existing State Name again")
 
-    def get_states(self) -> Dict[str, int]:
+        # convert all labels to their binary representations first
+        atom_bits = self._atom_bits
+        labels = self._states.labels
+        new_labels = {}
+        for state, label in states.items():
+            label_binary = 0b0
+            for atom in label:
+                # if the State Label contains a Non-Eixsting Atom, can't add it
+                if atom not in atom_bits:
+                    raise KripkeStructError("Can't add a State Label with a Non-Existing Atom")
+                label_binary |= atom_bits[atom]
+
+            # if the state label exists, or is used twice in this batch, can't add again
+            if label_binary in labels or label_binary in new_labels:
+                raise KripkeStructError("Can't add an Existing State Label again")
+            new_labels[label_binary] = _intern(state)
+
+        # all State Labels are already validated above, so the checks in "_states[...]" are skipped
+        for label_binary, state in new_labels.items():
+            self._states.set_validated(state, label_binary)
+
+    def get_states(self) -> Mapping[str, int]:
         """Get States of the Kripke Structure.
 
         Returns:
-            a dict, Key is the State Name, Value is the State Label
+            a read-only view of a dict, Key is the State Name, Value is the State Label
 
         Note:
             The State Label is store in the binary representation,
             instead of the list of strings.
+            The returned view is not a copy, so it reflects later changes to the Kripke Structure.
 
         """
-        return dict(self._states)
+        return MappingProxyType(self._states.data)
 
     def get_state_names(self) -> Set[str]:
         """Get just State Names of the Kripke Structure.
@@ -217,32 +347,25 @@ class KripkeStruct:
         if state not in self._states:
             raise KripkeStructError("Can't set the Label of a Non-Existing State")
 
-        # if the State Label contains a Non-Eixsting Atom, can't set it
-        for atom in label_set:
-            if atom not in self._atoms_set:
-                raise KripkeStructError("Can't set a State Label with a Non-Existing Atom")
-
         # convert the label to its binary representation
+        atom_bits = self._atom_bits
         label_binary = 0b0
-        for atom in self._atoms:
-            # if an Atom is in "label", set the corresponding bit to 1
-            if atom in label_set:
-                label_binary |= 0b1
-            # left shift by 1 bit
-            label_binary <<= 1
-
-        # correct the extra left shift
-        label_binary >>= 1
+        for atom in label_set:
+            # if the State Label contains a Non-Eixsting Atom, can't set it
+            if atom not in atom_bits:
+                raise KripkeStructError("Can't set a State Label with a Non-Existing Atom")
+            label_binary |= atom_bits[atom]
 
         # if the Label is already assigned to the State Name, do nothing
         if self._states[state] == label_binary:
             return
 
         # if the Label is assigned to a differnt State Name, can't assign it
-        if label_binary in self._states.values():
+        if label_binary in self._states.labels:
             raise KripkeStructError("Can't assign an Existing State Label to a Different State Name")
 
-        self._states[state] = label_binary
+        # the State Label is already validated above, so the checks in "_states[...]" are skipped
+        self._states.set_validated(state, label_binary)
 
     def get_label_of_state(self, state: str) -> Set[str]:
         """Given a State Name, get the corresponding State Label.
@@ -266,17 +389,11 @@ class KripkeStruct:
             raise KripkeStructError("Can't get the Label of a Non-Existing State")
 
         # get the binary form of the Label, then convert it to a set of atoms
-        label = self._states[state]
-        length = len(self._atoms)
-        label_set = set()
-
-        # traverse the binary form of the Label
-        for i in range(length):
-            # if the i-th bit is 1, then the (length - 1 - i)-th atom is in the set
-            if label & 1 << i:
-                label_set.add(self._atoms[length - 1 - i])
-
-        return label_set
+        # only the 1 bits are visited, so the cost is proportional to the size of the Label, not the number of Atoms
+        # if the i-th bit is 1, then the (length - 1 - i)-th atom is in the set
+        atoms = self._atoms
+        last = len(atoms) - 1
+        return {atoms[last - i] for i in _iter_bits(self._states[state])}
 
     def remove_state(self, state: str) -> None:
         """Remove a State from the Kripke Structure.
@@ -309,7 +426,21 @@ class KripkeStruct:
         Args:
             states: a list of strings representing the State Names
 
+        Raises:
+            KripkeStructError: if a State Name doesn't exist, or is listed twice, can't remove it
+
+        Note:
+            All State Names are validated before any of them is removed,
+            so if an error is raised, the Kripke Structure is left unchanged.
+
         """
+        # if any State Name doesn't exist, or is listed twice, can't remove it
+        # since it would no longer exist the second time
+        states = list(states)
+        states_set = set(states)
+        if len(states_set) != len(states) or not self._states.data.keys() >= states_set:
+            raise KripkeStructError("Can't remove a Non-Existing State")
+
         for state in states:
             self.remove_state(state)
 
@@ -327,11 +458,12 @@ class KripkeStruct:
             However, internally, the field "_starts" is stored as a set for efficiency.
 
         """
-        for start in starts:
-            # if a state doesn't exist, can't set it as a Start State
-            if start not in self._states:
-                raise KripkeStructError("Can't set a Non-Existing State as Start State")
-        self._starts = set(starts)
+        # if a state doesn't exist, can't set it as a Start State
+        # all states are validated at once with a set operation, instead of one lookup per state
+        starts_set = set(starts)
+        if not starts_set <= self._states.data.keys():
+            raise KripkeStructError("Can't set a Non-Existing State as Start State")
+        self._starts = set(map(_intern, starts_set))
 
     def get_starts(self) -> Set[str]:
         """Get Start States of the Kripke Structure.
@@ -357,19 +489,36 @@ class KripkeStruct:
             For more information about list v.s. set, see:
             https://stackoverflow.com/questions/2831212/python-sets-vs-lists
         """
-        for state, next_states in trans.items():
-            # if source state doesn't exist, can't add transition
-            if state not in self._states:
-                raise KripkeStructError("Can't add Transition from a Non-Existing Source State")
-
+        # build each list of Target States once, since it may be a one-shot iterable, e.g. a generator
+        targets = {state: list(next_states) for state, next_states in trans.items()}
+
+        # validate all Source and Target States at once with set operations, before adding any Transition
+        # so that no Transition is added if any of them is invalid
+        states = self._states.data.keys()
+
+        # if source state doesn't exist, can't add transition
+        if not states >= targets.keys():
+            raise KripkeStructError("Can't add Transition from a Non-Existing Source State")
+
+        # if target state doesn't exist, can't add transition
+        if not states >= set().union(*targets.values()):
+            raise KripkeStructError("Can't add Transition to a Non-Existing Target State")
+
+        # adding a Transition will also update the Inverted Transitions,
+        # which will be used to remove related Transitions when revmoing a State
+        # the successors of each Source State are added in bulk, and the inverted dict is bound to a local
+        trans_inverted = self._trans_inverted
+        for state, next_states in targets.items():
+            # a Source State without Target States does not get an entry in "_trans"
+            if not next_states:
+                continue
+            # intern the State Names, so that they are the same string objects as the keys of "_states"
+            state = _intern(state)
+            next_states = [_intern(next_state) for next_state in next_states]
+            self._trans[state].update(next_states)
             for next_state in next_states:
-                # if target state doesn't exist, can't add transition
-                if next_state not in self._states:
-                    raise KripkeStructError("Can't add Transition to a Non-Existing Target State")
-                # adding a Transition will also update the Inverted Transitions,
-                # which will be used to remove related Transitions when revmoing a State
-                self._trans[state].add(next_state)
-                self._trans_inverted[next_state].add(state)
+                trans_inverted[next_state].add(state)
+        self._dirty = True
 
     def get_trans(self) -> defaultdict[str, Set[str]]:
         """Get Transitions of the Kripke Structure.
@@ -396,22 +545,34 @@ class KripkeStruct:
             trans: a dict, Key is the Source State Name, Value is a list of Target State Names
 
         Raises:
-            KripkeStructError: if a Transition doesn't exist, can't remove it
+            KripkeStructError: if a Transition doesn't exist, or is listed twice, can't remove it
 
         Note:
             The parameter "trans" should be a dict whose value is a list for efficiency,
             since it will only be iterated once.
             However, internally, the field "_trans" is stored as a dict whose value is a set for efficiency.
+            All Transitions are validated before any of them is removed,
+            so if an error is raised, the Kripke Structure is left unchanged.
 
         """
+        # validate all Transitions first, without inserting into the defaultdict
+        removals: List[Tuple[str, Set[str]]] = []
         for state, next_states in trans.items():
-            for next_state in next_states:
-                # if a Transition doesn't exist, can't remove it
-                if (state not in self._trans) or (next_state not in self._trans[state]):
-                    raise KripkeStructError("Can't remove a Non-Existing Transition")
-                # removing a Transition will also update the Inverted Transitions
-                self._trans[state].remove(next_state)
+            next_states_list = list(next_states)
+            next_states_set = set(next_states_list)
+            # if a Transition doesn't exist, or is listed twice, can't remove it
+            if len(next_states_set) != len(next_states_list) or not self._trans.get(state, set()) >= next_states_set:
+                raise KripkeStructError("Can't remove a Non-Existing Transition")
+            if next_states_set:
+                removals.append((state, next_states_set))
+
+        for state, next_states_set in removals:
+            # removing a Transition will also update the Inverted Transitions
+            # both are sets, so each removal is O(1) instead of a linear scan
+            self._trans[state] -= next_states_set
+            for next_state in next_states_set:
                 self._trans_inverted[next_state].remove(state)
+        self._dirty = True
 
     def reverse_all_trans(self) -> None:
         """Reverse all Transitions in the Kripke Structure.
@@ -422,62 +583,371 @@ class KripkeStruct:
 
         """
         self._trans, self._trans_inverted = self._trans_inverted, self._trans
+        self._dirty = True
 
-    def get_SCCs(self) -> List[Set[str]]:
+    def get_SCCs(self) -> List[FrozenSet[str]]:
         """Get all Strongly Connected Components (SCCs) in the Kripke Structure.
 
         Returns:
-            a list of sets, where each set contains the State Names in a SCC
+            a list of frozensets, where each frozenset contains the State Names in a SCC,
+            and a SCC comes after all SCCs reachable from it, i.e. in reverse topological order
+
+        """
+        # we run Tarjan's Algorithm on the cached CSR arrays of the whole Kripke Structure
+        # the result is cached until the Kripke Structure is modified
+        self._ensure_masks()
+        if self._SCC_masks is None:
+            self._SCC_masks = self._get_SCC_masks(self._all_mask)
+
+        # then convert each SCC from a State Mask back to a set of State Names
+        return [frozenset(self._to_states(SCC_mask)) for SCC_mask in self._SCC_masks]
+
+    def get_reachable_states(self, states: Optional[Iterable[str]] = None) -> Set[str]:
+        """Get all States reachable from the given States, including the given States themselves.
+
+        Args:
+            states: an iterable of strings representing the State Names, default to the Start States
+
+        Returns:
+            a set of strings representing the reachable State Names
+
+        Raises:
+            KripkeStructError: if a State doesn't exist, can't search from it
+
+        """
+        if states is None:
+            states = self._starts
+
+        # if a State doesn't exist, can't search from it
+        states = set(states)
+        if not states <= self._states.data.keys():
+            raise KripkeStructError("Can't search from a Non-Existing State")
+
+        self._ensure_masks()
+        return self._to_states(self._get_reachable_mask(self._to_mask(states)))
+
+    def has_path(self, source: str, target: str) -> bool:
+        """Check if there is a Path from a State to another State.
+
+        A State always has a Path of length 0 to itself.
+
+        Args:
+            source: a string representing the State Name where the Path starts
+            target: a string representing the State Name where the Path ends
+
+        Returns:
+            True if "target" is reachable from "source", False otherwise
+
+        Raises:
+            KripkeStructError: if a State doesn't exist, can't find a Path from or to it
+
+        """
+        # if a State doesn't exist, can't find a Path from or to it
+        if source not in self._states or target not in self._states:
+            raise KripkeStructError("Can't find a Path from or to a Non-Existing State")
+
+        self._ensure_masks()
+        return self._has_path(self._state_ids[source], self._state_ids[target])
+
+    def clone(self) -> "KripkeStruct":
+        """Create an independent copy of the Kripke Structure.
+
+        This is much cheaper than "copy.deepcopy", since only the containers are copied,
+        while the State Names, the State Labels, and the cached State Masks are immutable, so they are shared.
+
+        Returns:
+            a new Kripke Structure, modifying it won't affect the original one
+
+        """
+        # the new instance is of the same class, so its protected members are filled in directly
+        # pylint: disable=protected-access
+        ks = KripkeStruct()
+        ks._atoms = self._atoms
+        ks._atoms_set = set(self._atoms_set)
+        ks._atom_bits = dict(self._atom_bits)
+
+        # copy the State dict without validating each State Label again, since they are already unique
+        ks._states = self._states.copy()
+
+        ks._starts = set(self._starts)
+        ks._trans = defaultdict(set, {state: set(next_states) for state, next_states in self._trans.items()})
+        ks._trans_inverted = defaultdict(
+            set, {state: set(prev_states) for state, prev_states in self._trans_inverted.items()}
+        )
+
+        # the cached State Masks are never modified in place, only replaced when rebuilt, so they can be shared
+        ks._state_ids = self._state_ids
+        ks._state_names = self._state_names
+        ks._all_mask = self._all_mask
+        ks._atom_masks = self._atom_masks
+        ks._pred_masks = self._pred_masks
+        ks._succ_indptr = self._succ_indptr
+        ks._succ_indices = self._succ_indices
+        ks._SCC_masks = self._SCC_masks
+        ks._SAT_cache = OrderedDict(self._SAT_cache)
+        ks._dirty = self._dirty
+        return ks
+
+    def _ensure_masks(self) -> None:
+        """Rebuild the cached State Indices and State Masks, if the Kripke Structure has been modified."""
+        if self._dirty or self._states.modified:
+            self._build_masks()
+
+    def _build_masks(self) -> None:
+        """Build the cached State Indices and State Masks from scratch.
+
+        Each State is assigned a bit position, following the insertion order of "_states".
+        Then a set of States can be represented as an int, called a State Mask,
+        which makes the set operations used by the Model Checking algorithms a few bitwise operations.
+
+        """
+        self._state_names = tuple(self._states)
+        self._state_ids = {state: i for i, state in enumerate(self._state_names)}
+        self._all_mask = (1 << len(self._state_names)) - 1
+
+        # precompute the Atom Mask of each Atom, so that SAT_atom becomes a dict lookup
+        # the j-th lowest bit of a State Label stands for the (n - 1 - j)-th Atom, where n is the number of Atoms
+        atoms = self._atoms
+        atoms_num = len(atoms)
+        atom_masks = dict.fromkeys(atoms, 0)
+        for i, state in enumerate(self._state_names):
+            for j in _iter_bits(self._states[state]):
+                atom_masks[atoms[atoms_num - 1 - j]] |= 1 << i
+        self._atom_masks = atom_masks
+
+        # store the successors of each State in the Compressed Sparse Row (CSR) format
+        # so that graph traversals only index into flat lists of ints, instead of hashing State Names
+        # and precompute the Predecessor Mask of each State in the same pass, so that EX becomes an OR-reduction
+        state_ids = self._state_ids
+        pred_masks = [0] * len(self._state_names)
+        succ_indptr = [0]
+        succ_indices = []
+        for i, state in enumerate(self._state_names):
+            state_bit = 1 << i
+            for next_state in self._trans.get(state, ()):
+                j = state_ids[next_state]
+                succ_indices.append(j)
+                pred_masks[j] |= state_bit
+            succ_indptr.append(len(succ_indices))
+        self._pred_masks = pred_masks
+        self._succ_indptr = succ_indptr
+        self._succ_indices = succ_indices
+
+        # the SCCs and the results of CTL formulas are computed when asked for, then cached until the next mutation
+        self._SCC_masks = None
+        self._SAT_cache = OrderedDict()
+
+        self._dirty = False
+        self._states.modified = False
+
+    def _to_mask(self, states: Iterable[str]) -> int:
+        """Convert a set of State Names to a State Mask.
+
+        Args:
+            states: an iterable of strings representing the State Names
+
+        Returns:
+            an int, where the i-th bit is 1 iff the i-th State is in "states"
+
+        Note:
+            State Names that don't exist in the Kripke Structure are ignored,
+            just like the CTL operators ignore them in a property.
+
+        """
+        state_ids = self._state_ids
+        mask = 0
+        for state in states:
+            if state in state_ids:
+                mask |= 1 << state_ids[state]
+        return mask
+
+    def _to_states(self, mask: int) -> Set[str]:
+        """Convert a State Mask back to a set of State Names.
+
+        Args:
+            mask: an int, where the i-th bit is 1 iff the i-th State is in the set
+
+        Returns:
+            a set of strings representing the State Names
+
+        """
+        state_names = self._state_names
+        return {state_names[i] for i in _iter_bits(mask)}
+
+    def _get_reachable_mask(self, mask: int) -> int:
+        """Get the State Mask of all States reachable from the States in a State Mask.
+
+        We use an iterative Depth-First Search on the CSR arrays, so each Transition is visited at most once.
+        The caller is responsible for calling "_ensure_masks()" beforehand.
+
+        Args:
+            mask: a State Mask of the States to search from
+
+        Returns:
+            a State Mask of all reachable States, including the States in "mask"
+
+        """
+        indptr = self._succ_indptr
+        indices = self._succ_indices
+
+        # "visited" avoids shifting a big int for every visited Transition
+        visited = [False] * len(self._state_names)
+        stack = list(_iter_bits(mask))
+        for state in stack:
+            visited[state] = True
+
+        while stack:
+            state = stack.pop()
+            for next_state in indices[indptr[state] : indptr[state + 1]]:
+                if not visited[next_state]:
+                    visited[next_state] = True
+                    mask |= 1 << next_state
+                    stack.append(next_state)
+        return mask
+
+    def _has_path(self, source: int, target: int) -> bool:
+        """Check if there is a Path from a State to another State, given their State Indices.
+
+        We use a Bidirectional Breadth-First Search, forward from "source" on the CSR arrays,
+        and backward from "target" on the Predecessor Masks.
+        Each round expands the smaller frontier by one step, and the search stops as soon as the two sides meet.
+        The caller is responsible for calling "_ensure_masks()" beforehand.
+
+        Args:
+            source: the State Index where the Path starts
+            target: the State Index where the Path ends
+
+        Returns:
+            True if "target" is reachable from "source", False otherwise
+
+        """
+        if source == target:
+            return True
+
+        indptr = self._succ_indptr
+        indices = self._succ_indices
+        pred_masks = self._pred_masks
+        num_states = len(self._state_names)
+
+        forward_visited = [False] * num_states
+        backward_visited = [False] * num_states
+        forward_visited[source] = True
+        backward_visited[target] = True
+        forward_frontier = [source]
+        backward_frontier = [target]
+
+        # if either side runs out of States to expand, the two sides can never meet
+        while forward_frontier and backward_frontier:
+            next_frontier = []
+            if len(forward_frontier) <= len(backward_frontier):
+                for state in forward_frontier:
+                    for next_state in indices[indptr[state] : indptr[state + 1]]:
+                        if backward_visited[next_state]:
+                            return True
+                        if not forward_visited[next_state]:
+                            forward_visited[next_state] = True
+                            next_frontier.append(next_state)
+                forward_frontier = next_frontier
+            else:
+                for state in backward_frontier:
+                    for prev_state in _iter_bits(pred_masks[state]):
+                        if forward_visited[prev_state]:
+                            return True
+                        if not backward_visited[prev_state]:
+                            backward_visited[prev_state] = True
+                            next_frontier.append(prev_state)
+                backward_frontier = next_frontier
+        return False
+
+    def _get_SCC_masks(self, mask: int) -> List[int]:  # pylint: disable=too-many-locals
+        """Get all Strongly Connected Components (SCCs) of the sub-graph restricted to a State Mask.
+
+        We use an iterative version of Tarjan's Algorithm on the CSR arrays,
+        so there is no recursion limit and no copy of the Kripke Structure.
+        The caller is responsible for calling "_ensure_masks()" beforehand.
+
+        Args:
+            mask: a State Mask, only States in it (and Transitions between them) are considered
+
+        Returns:
+            a list of State Masks, where each State Mask contains the States in a SCC
+
+        """
+        indptr = self._succ_indptr
+        indices = self._succ_indices
+        num_states = len(self._state_names)
+
+        # "in_mask" avoids shifting a big int for every visited Transition
+        in_mask = [False] * num_states
+        for i in _iter_bits(mask):
+            in_mask[i] = True
+
+        index = [-1] * num_states
+        lowlink = [0] * num_states
+        on_stack = [False] * num_states
+        scc_stack = []
+        SCC_masks = []
+        counter = 0
+
+        for root in _iter_bits(mask):
+            if index[root] >= 0:
+                continue
+            index[root] = lowlink[root] = counter
+            counter += 1
+            scc_stack.append(root)
+            on_stack[root] = True
+
+            # each frame of "call_stack" is a State and the position of its next successor to visit
+            call_stack = [(root, indptr[root])]
+            while call_stack:
+                state, pos = call_stack.pop()
+                end = indptr[state + 1]
+                while pos < end:
+                    next_state = indices[pos]
+                    pos += 1
+                    if not in_mask[next_state]:
+                        continue
+                    if index[next_state] < 0:
+                        # descend into the un-visited successor, and resume "state" from "pos" later
+                        call_stack.append((state, pos))
+                        index[next_state] = lowlink[next_state] = counter
+                        counter += 1
+                        scc_stack.append(next_state)
+                        on_stack[next_state] = True
+                        call_stack.append((next_state, indptr[next_state]))
+                        break
+                    if on_stack[next_state] and index[next_state] < lowlink[state]:
+                        lowlink[state] = index[next_state]
+                else:
+                    # all successors are visited, if "state" is the root of a SCC, pop the SCC
+                    if lowlink[state] == index[state]:
+                        SCC_masks.append(self._pop_SCC_mask(scc_stack, on_stack, state))
+
+                    # propagate the lowlink back to the parent
+                    if call_stack:
+                        parent = call_stack[-1][0]
+                        if lowlink[state] < lowlink[parent]:
+                            lowlink[parent] = lowlink[state]
+
+        return SCC_masks
+
+    @staticmethod
+    def _pop_SCC_mask(scc_stack: List[int], on_stack: List[bool], root: int) -> int:
+        """Pop a SCC off the stack of Tarjan's Algorithm, down to and including its root.
+
+        Args:
+            scc_stack: the State Indices on the stack of Tarjan's Algorithm
+            on_stack: the i-th one is True iff the i-th State is on "scc_stack"
+            root: the State Index of the root of the SCC
+
+        Returns:
+            a State Mask containing the States in the SCC
 
         """
-        # we use Kosaraju's Algorithm to find SCCs
-        # first, we run DFS on the original graph, store the order of finishing states in "order_stack"
-        order_stack = []
-        visited = set()
-
-        def DFS(state, visited, order_stack):
-            visited.add(state)
-            successors = self._trans[state]
-            for successor in successors:
-                if successor not in visited:
-                    DFS(successor, visited, order_stack)
-            # add to order_stack when exiting DFS
-            order_stack.append(state)
-
-        for state in self._states:
-            if state not in visited:
-                DFS(state, visited, order_stack)
-
-        # second, we create the reversed graph of the Kripke Structure self
-        # since we need to modify the reversed graph, we create a deepcopy of self
-        reversed_graph = deepcopy(self)
-        reversed_graph.reverse_all_trans()
-
-        # third we run multiple rounds of DFS on the reversed graph until all states are visited
-        # when we finish a round of DFS, we get a SCC
-        # then we add the SCC to the set, and remove all states in the SCC from the reversed graph
-        SCCs = set()
-        while reversed_graph.get_states():
-            # we run DFS on the reversed graph, following the order of the "order_stack"
-            tmp_stack = [order_stack.pop()]
-            visited = set()
-            while tmp_stack:
-                current_state = tmp_stack.pop()
-                visited.add(current_state)
-
-                # remove the visited state from the order_stack
-                if current_state in order_stack:
-                    order_stack.remove(current_state)
-
-                # add un-visited successors to the stack
-                successors = reversed_graph.get_trans()[current_state]
-                for successor in successors:
-                    if successor not in visited:
-                        tmp_stack.append(successor)
-
-            # now all states in the set "visited" are in the same SCC
-            # so we add it to the list of SCCs, and remove all states in it from the reversed graph
-            SCCs.add(frozenset(visited))
-            reversed_graph.remove_states(list(visited))
-
-        return SCCs
+        SCC_mask = 0
+        while True:
+            member = scc_stack.pop()
+            on_stack[member] = False
+            SCC_mask |= 1 << member
+            if member == root:
+                return SCC_mask
@@ -1,15 +1,12 @@
 # Authors: marcusm117
 # License: Apache 2.0
 
-# Standard Libraries
-from copy import deepcopy
-
 # External Libraries
 import pytest
 
 # Internal Modules to be tested
 from mctk import KripkeStruct, KripkeStructError
-from mctk import SAT_atom, NOT, AND, OR, IMPLIES, IFF, EX, AX, EU, EF, AG, EG, AF, AU
+from mctk import SAT, SAT_atom, NOT, AND, OR, IMPLIES, IFF, EX, AX, EU, EF, AG, EG, AF, AU
 
 
 ks_json = {
@@ -37,6 +34,12 @@ ks_json = {
 ks = KripkeStruct(ks_json)
 
 
+@pytest.fixture(scope="module")
+def atoms():
+    # the states satisfying each Atomic Property, shared by all the parametrized tests
+    return {atom: SAT_atom(ks, atom) for atom in ("a", "b", "c", "d", "True", "False")}
+
+
 def test_ESMC_SAT_atom():
     sat_states = SAT_atom(ks, "a")
     assert sat_states == {"s1", "s2"}
@@ -61,6 +64,26 @@ def test_ESMC_SAT_atom():
     sat_states = SAT_atom(ks, "False")
     assert sat_states == set()
 
+    # an Atom can be checked right after it's set, even if no State is added yet
+    tmp_ks = KripkeStruct()
+    tmp_ks.set_atoms(["p"])
+    assert SAT_atom(tmp_ks, "p") == set()
+
+    # after the Atoms are reset, a previous Atom can't be checked anymore
+    tmp_ks.add_state("s1", ["p"])
+    assert SAT_atom(tmp_ks, "p") == {"s1"}
+    tmp_ks.remove_state("s1")
+    assert SAT_atom(tmp_ks, "p") == set()
+    assert SAT(tmp_ks, ("NOT", "p")) == set()
+    tmp_ks.set_atoms(["q"])
+    assert SAT_atom(tmp_ks, "q") == set()
+    with pytest.raises(KripkeStructError) as error_info:
+        SAT_atom(tmp_ks, "p")
+    assert str(error_info.value) == "Can't check on an atom that's not in the Kripke Structure"
+    with pytest.raises(KripkeStructError) as error_info:
+        SAT(tmp_ks, ("NOT", "p"))
+    assert str(error_info.value) == "Can't check on an atom that's not in the Kripke Structure"
+
 
 def test_ESMC_NOT():
     sat_states = NOT(ks, SAT_atom(ks, "a"))
@@ -75,119 +98,126 @@ def test_ESMC_NOT():
     sat_states = NOT(ks, SAT_atom(ks, "False"))
     assert sat_states == set(ks.get_states().keys())
 
-
-def test_ESMC_AND():
-    sat_states = AND(SAT_atom(ks, "a"), SAT_atom(ks, "b"))
-    assert sat_states == {"s2"}
-
-    sat_states = AND(SAT_atom(ks, "a"), SAT_atom(ks, "c"))
-    assert sat_states == set()
-
-    sat_states = AND(SAT_atom(ks, "b"), SAT_atom(ks, "c"))
-    assert sat_states == {"s3", "s4"}
-
-
-def test_ESMC_OR():
-    sat_states = OR(SAT_atom(ks, "a"), SAT_atom(ks, "b"))
-    assert sat_states == {"s1", "s2", "s3", "s4", "s5"}
-
-    sat_states = OR(SAT_atom(ks, "a"), SAT_atom(ks, "c"))
-    assert sat_states == {"s1", "s2", "s3", "s4", "s6"}
-
-
-def test_ESMC_IMPLIES():
-    sat_states = IMPLIES(ks, SAT_atom(ks, "a"), SAT_atom(ks, "b"))
-    assert sat_states == {"s2", "s3", "s4", "s5", "s6", "s7"}
-
-    sat_states = IMPLIES(ks, SAT_atom(ks, "a"), SAT_atom(ks, "c"))
-    assert sat_states == {"s3", "s4", "s5", "s6", "s7"}
-
-    sat_states = IMPLIES(ks, SAT_atom(ks, "b"), SAT_atom(ks, "c"))
-    assert sat_states == {"s1", "s3", "s4", "s6", "s7"}
-
-
-def test_ESMC_IFF():
-    sat_states = IFF(ks, SAT_atom(ks, "a"), SAT_atom(ks, "b"))
-    assert sat_states == {"s2", "s6", "s7"}
-
-    sat_states = IFF(ks, SAT_atom(ks, "a"), SAT_atom(ks, "c"))
-    assert sat_states == {"s5", "s7"}
-
-    sat_states = IFF(ks, SAT_atom(ks, "b"), SAT_atom(ks, "c"))
-    assert sat_states == {"s1", "s3", "s4", "s7"}
-
-
-def test_ESMC_EX():
-    sat_states = EX(ks, SAT_atom(ks, "a"))
-    assert sat_states == {"s1"}
-
-    sat_states = EX(ks, SAT_atom(ks, "b"))
-    assert sat_states == {"s1", "s2", "s3", "s6", "s7"}
-
-    sat_states = EX(ks, SAT_atom(ks, "c"))
-    assert sat_states == {"s2", "s3", "s5"}
-
-    sat_states = EX(ks, SAT_atom(ks, "d"))
-    assert sat_states == {"s2", "s3", "s4", "s6"}
-
-
-def test_ESMC_AX():
-    sat_states = AX(ks, SAT_atom(ks, "a"))
-    assert sat_states == {"s1"}
-
-    sat_states = AX(ks, SAT_atom(ks, "b"))
-    assert sat_states == {"s1", "s2", "s3", "s7"}
-
-    sat_states = AX(ks, SAT_atom(ks, "c"))
-    assert sat_states == {"s2", "s3", "s5"}
-
-    sat_states = AX(ks, SAT_atom(ks, "d"))
-    assert sat_states == {"s3", "s4"}
-
-
-def test_ESMC_EU():
-    sat_states = EU(ks, SAT_atom(ks, "a"), SAT_atom(ks, "b"))
-    assert sat_states == {"s1", "s2", "s3", "s4", "s5"}
-
-    sat_states = EU(ks, SAT_atom(ks, "a"), SAT_atom(ks, "c"))
-    assert sat_states == {"s1", "s2", "s3", "s4", "s6"}
-
-    sat_states = EU(ks, SAT_atom(ks, "b"), SAT_atom(ks, "c"))
-    assert sat_states == {"s2", "s3", "s4", "s5", "s6"}
-
-
-def test_ESMC_EF():
-    sat_states = EF(ks, SAT_atom(ks, "a"))
-    assert sat_states == {"s1", "s2"}
-
-    sat_states = EF(ks, SAT_atom(ks, "b"))
-    assert sat_states == {"s1", "s2", "s3", "s4", "s5", "s6", "s7"}
-
-    sat_states = EF(ks, SAT_atom(ks, "c"))
-    assert sat_states == {"s1", "s2", "s3", "s4", "s5", "s6", "s7"}
-
-    sat_states = EF(ks, SAT_atom(ks, "d"))
-    assert sat_states == {"s1", "s2", "s3", "s4", "s5", "s6", "s7"}
-
-
-def test_ESMC_AG():
-    sat_states = AG(ks, SAT_atom(ks, "a"))
-    assert sat_states == set()
-
-    sat_states = AG(ks, SAT_atom(ks, "b"))
-    assert sat_states == set()
-
-    sat_states = AG(ks, SAT_atom(ks, "c"))
-    assert sat_states == set()
-
-    sat_states = AG(ks, SAT_atom(ks, "d"))
-    assert sat_states == set()
+    # State Names that are not in the Kripke Structure are ignored
+    sat_states = NOT(ks, {"s1", "s8"})
+    assert sat_states == set(ks.get_states().keys()) - {"s1"}
+
+
+@pytest.mark.parametrize(
+    "atom1, atom2, expected",
+    [
+        ("a", "b", {"s2"}),
+        ("a", "c", set()),
+        ("b", "c", {"s3", "s4"}),
+    ],
+)
+def test_ESMC_AND(atoms, atom1, atom2, expected):
+    assert AND(atoms[atom1], atoms[atom2]) == expected
+
+
+@pytest.mark.parametrize(
+    "atom1, atom2, expected",
+    [
+        ("a", "b", {"s1", "s2", "s3", "s4", "s5"}),
+        ("a", "c", {"s1", "s2", "s3", "s4", "s6"}),
+    ],
+)
+def test_ESMC_OR(atoms, atom1, atom2, expected):
+    assert OR(atoms[atom1], atoms[atom2]) == expected
+
+
+@pytest.mark.parametrize(
+    "atom1, atom2, expected",
+    [
+        ("a", "b", {"s2", "s3", "s4", "s5", "s6", "s7"}),
+        ("a", "c", {"s3", "s4", "s5", "s6", "s7"}),
+        ("b", "c", {"s1", "s3", "s4", "s6", "s7"}),
+    ],
+)
+def test_ESMC_IMPLIES(atoms, atom1, atom2, expected):
+    assert IMPLIES(ks, atoms[atom1], atoms[atom2]) == expected
+
+
+@pytest.mark.parametrize(
+    "atom1, atom2, expected",
+    [
+        ("a", "b", {"s2", "s6", "s7"}),
+        ("a", "c", {"s5", "s7"}),
+        ("b", "c", {"s1", "s3", "s4", "s7"}),
+    ],
+)
+def test_ESMC_IFF(atoms, atom1, atom2, expected):
+    assert IFF(ks, atoms[atom1], atoms[atom2]) == expected
+
+
+@pytest.mark.parametrize(
+    "atom, expected",
+    [
+        ("a", {"s1"}),
+        ("b", {"s1", "s2", "s3", "s6", "s7"}),
+        ("c", {"s2", "s3", "s5"}),
+        ("d", {"s2", "s3", "s4", "s6"}),
+    ],
+)
+def test_ESMC_EX(atoms, atom, expected):
+    assert EX(ks, atoms[atom]) == expected
+
+
+@pytest.mark.parametrize(
+    "atom, expected",
+    [
+        ("a", {"s1"}),
+        ("b", {"s1", "s2", "s3", "s7"}),
+        ("c", {"s2", "s3", "s5"}),
+        ("d", {"s3", "s4"}),
+    ],
+)
+def test_ESMC_AX(atoms, atom, expected):
+    assert AX(ks, atoms[atom]) == expected
+
+
+@pytest.mark.parametrize(
+    "atom1, atom2, expected",
+    [
+        ("a", "b", {"s1", "s2", "s3", "s4", "s5"}),
+        ("a", "c", {"s1", "s2", "s3", "s4", "s6"}),
+        ("b", "c", {"s2", "s3", "s4", "s5", "s6"}),
+    ],
+)
+def test_ESMC_EU(atoms, atom1, atom2, expected):
+    assert EU(ks, atoms[atom1], atoms[atom2]) == expected
+
+
+@pytest.mark.parametrize(
+    "atom, expected",
+    [
+        ("a", {"s1", "s2"}),
+        ("b", {"s1", "s2", "s3", "s4", "s5", "s6", "s7"}),
+        ("c", {"s1", "s2", "s3", "s4", "s5", "s6", "s7"}),
+        ("d", {"s1", "s2", "s3", "s4", "s5", "s6", "s7"}),
+    ],
+)
+def test_ESMC_EF(atoms, atom, expected):
+    assert EF(ks, atoms[atom]) == expected
+
+
+@pytest.mark.parametrize(
+    "atom, expected",
+    [
+        ("a", set()),
+        ("b", set()),
+        ("c", set()),
+        ("d", set()),
+    ],
+)
+def test_ESMC_AG(atoms, atom, expected):
+    assert AG(ks, atoms[atom]) == expected
 
 
 def test_ESMC_EG():
     # change s5's label to {"b", "d"}
     # change s6's label to {"c", "d"}
-    tmp_ks = deepcopy(ks)
+    tmp_ks = ks.clone()
     tmp_ks.set_label_of_state("s5", {"b", "d"})
     tmp_ks.set_label_of_state("s6", {"c", "d"})
 
@@ -207,10 +237,15 @@ def test_ESMC_EG():
     sat_states = EG(tmp_ks, SAT_atom(tmp_ks, "d"))
     assert sat_states == {"s5", "s6", "s7"}
 
+    # a single state with a self-loop is also a non-trivial SCC
+    tmp_ks.add_trans({"s1": ["s1"]})
+    sat_states = EG(tmp_ks, SAT_atom(tmp_ks, "a"))
+    assert sat_states == {"s1"}
+
 
 def test_ESMC_AF():
     # change s7 to "", which is empty set
-    tmp_ks = deepcopy(ks)
+    tmp_ks = ks.clone()
     tmp_ks.set_label_of_state("s7", set())
 
     sat_states = AF(tmp_ks, SAT_atom(tmp_ks, "a"))
@@ -226,15 +261,16 @@ def test_ESMC_AF():
     assert sat_states == {"s1", "s2", "s3", "s4"}
 
 
-def test_ESMC_AU():
-    sat_states = AU(ks, SAT_atom(ks, "a"), SAT_atom(ks, "b"))
-    assert sat_states == {"s1", "s2", "s3", "s4", "s5"}
-
-    sat_states = AU(ks, SAT_atom(ks, "a"), SAT_atom(ks, "c"))
-    assert sat_states == {"s1", "s2", "s3", "s4", "s6"}
-
-    sat_states = AU(ks, SAT_atom(ks, "b"), SAT_atom(ks, "c"))
-    assert sat_states == {"s2", "s3", "s4", "s5", "s6"}
+@pytest.mark.parametrize(
+    "atom1, atom2, expected",
+    [
+        ("a", "b", {"s1", "s2", "s3", "s4", "s5"}),
+        ("a", "c", {"s1", "s2", "s3", "s4", "s6"}),
+        ("b", "c", {"s2", "s3", "s4", "s5", "s6"}),
+    ],
+)
+def test_ESMC_AU(atoms, atom1, atom2, expected):
+    assert AU(ks, atoms[atom1], atoms[atom2]) == expected
 
 
 # Integrated Tests
@@ -252,6 +288,60 @@ def test_ESMC_composite_CTL_formula():
     print(sat_states)
     assert sat_states == {"s1", "s2", "s3", "s4", "s6"}
 
+    # State Names that are not in the Kripke Structure are ignored by all operators
+    assert EX(ks, {"s2", "s8"}) == EX(ks, {"s2"})
+    assert EU(ks, {"s8"}, {"s7", "s9"}) == {"s7"}
+    assert AU(ks, {"s1", "s8"}, {"s2"}) == {"s1", "s2"}
+
+
+def test_ESMC_SAT():
+    assert SAT(ks, ("EF", ("AND", "a", "b"))) == {"s1", "s2"}
+    assert SAT(ks, ("AU", ("NOT", "a"), "c")) == {"s3", "s4", "s5", "s6", "s7"}
+    assert SAT(ks, ("EX", ("AF", "b"))) == {"s1", "s2", "s3", "s4", "s5", "s6", "s7"}
+    assert SAT(ks, ("AU", ("EX", "b"), "c")) == {"s1", "s2", "s3", "s4", "s6"}
+
+    # a shared sub-formula gives the same result as evaluating it separately
+    assert SAT(ks, ("OR", ("EG", "b"), ("NOT", ("EG", "b")))) == SAT(ks, "True")
+    assert SAT(ks, ("AND", ("EG", "b"), ("EG", "b"))) == EG(ks, SAT_atom(ks, "b"))
+
+    # a compiled formula can be checked again, on a different Kripke Structure
+    tmp_ks = ks.clone()
+    tmp_ks.add_trans({"s3": ["s3"]})
+    assert SAT(tmp_ks, ("AND", ("EG", "b"), ("EG", "b"))) == {"s2", "s3"}
+
+    # the results of sub-formulas are cached until the Kripke Structure is modified
+    assert ("EG", "b") in tmp_ks._SAT_cache
+    tmp_ks.remove_trans({"s3": ["s3"]})
+    assert SAT(tmp_ks, ("EG", "b")) == EG(ks, SAT_atom(ks, "b"))
+    assert ("AND", ("EG", "b"), ("EG", "b")) not in tmp_ks._SAT_cache
+
+    # the cache keeps only the most recently used sub-formulas
+    formulas = [("EX", "a")]
+    for _ in range(200):
+        formulas.append(("EX", formulas[-1]))
+    assert SAT(tmp_ks, formulas[-1]) == EX(ks, SAT(ks, formulas[-2]))
+    assert len(tmp_ks._SAT_cache) == 128
+    assert formulas[-1] in tmp_ks._SAT_cache
+    assert "a" not in tmp_ks._SAT_cache
+
+    with pytest.raises(KripkeStructError) as e:
+        SAT(ks, ("XOR", "a", "b"))
+    assert str(e.value) == "Can't check a formula with an unknown operator: XOR"
+
+    with pytest.raises(KripkeStructError) as e:
+        SAT(ks, ("EX", "a", "b"))
+    assert str(e.value) == "The operator EX should have 1 operand(s)"
+
+    with pytest.raises(KripkeStructError) as e:
+        SAT(ks, ("EX", "e"))
+    assert str(e.value) == "Can't check on an atom that's not in the Kripke Structure"
+
+    # a formula must be a string or a nested tuple
+    for formula in (["EX", "a"], ("EX", ["a"]), ("EX", 5), ("AND", "a", ()), 5):
+        with pytest.raises(KripkeStructError) as e:
+            SAT(ks, formula)
+        assert str(e.value) == "Can't check a formula that's not a string or a nested tuple"
+
 
 # Integrated Tests: examples in documentations
 def test_ESMC_examples():
@@ -3,6 +3,7 @@
 
 # Standard Libraries
 from collections import defaultdict
+from copy import copy
 
 # External Libraries
 import pytest
@@ -21,6 +22,10 @@ def test_KS_default_init():
     assert ks._trans == defaultdict(set)
     assert ks._trans_inverted == defaultdict(set)
 
+    # a misspelled attribute can't be created by accident
+    with pytest.raises(AttributeError):
+        ks._stats = {}
+
 
 # Tests for KripkeStruct(ks_json)
 def test_KS_json_init():
@@ -102,6 +107,10 @@ def test_KS_add_state():
         ks.add_state("s3", ["a", "b", "c", "d", "e"])
     assert str(error_info.value) == "Can't add a State Label with a Non-Existing Atom"
 
+    # a State Name that is not a str is kept as it is
+    ks.add_state(3, ["c"])
+    assert 3 in ks.get_state_names()
+
 
 def test_KS_add_states():
     ks = KripkeStruct()
@@ -127,6 +136,18 @@ def test_KS_add_states():
         "s7": 0b0001,  # s7 has label "d"
     }
 
+    # if any State in the batch is invalid, no State is added
+    with pytest.raises(KripkeStructError) as e:
+        ks.add_states({"s8": ["a", "c"], "s9": ["a", "c"]})
+    assert str(e.value) == "Can't add an Existing State Label again"
+    with pytest.raises(KripkeStructError) as e:
+        ks.add_states({"s8": ["a", "c"], "s9": ["e"]})
+    assert str(e.value) == "Can't add a State Label with a Non-Existing Atom"
+    with pytest.raises(KripkeStructError) as e:
+        ks.add_states({"s8": ["a", "c"], "s1": ["a", "d"]})
+    assert str(e.value) == "Can't add an Existing State Name again"
+    assert "s8" not in ks.get_state_names()
+
 
 def test_KS_get_states():
     ks = KripkeStruct()
@@ -135,6 +156,10 @@ def test_KS_get_states():
     ks.add_state("s1", ["a"])
     assert ks.get_states() == {"s1": 0b1000}
 
+    # the States can't be modified through the returned view
+    with pytest.raises(TypeError):
+        ks.get_states()["s2"] = 0b0100
+
 
 def test_KS_get_state_names():
     ks = KripkeStruct()
@@ -152,6 +177,13 @@ def test_KS_set_label_of_state():
     ks.set_label_of_state("s1", {"c", "d"})
     assert ks.get_states() == {"s1": 0b0011}
 
+    # the old Label of a State can be assigned to another State
+    ks.add_state("s0", ["a"])
+    assert ks.get_label_of_state("s0") == {"a"}
+    assert ks.get_states() == {"s1": 0b0011, "s0": 0b1000}
+    ks.remove_state("s0")
+    assert ks.get_states() == {"s1": 0b0011}
+
     # if the State Name doesn't exist, can't set the Label of it
     with pytest.raises(KripkeStructError) as error_info:
         ks.set_label_of_state("s2", {"a", "b", "c", "d"})
@@ -229,6 +261,10 @@ def test_KS_remove_state():
         "s6": 0b0010,  # s6 has label "c"
     }
 
+    # the State Label of a removed State can be used again
+    ks.add_state("s0", ["d"])
+    assert ks.get_label_of_state("s0") == {"d"}
+
     # if the State Name doesn't exist, can't remove it
     with pytest.raises(KripkeStructError) as error_info:
         ks.remove_state("s8")
@@ -250,6 +286,15 @@ def test_KS_remove_states():
     }
     ks.add_states(states)
     ks.remove_states(["s6", "s7"])
+
+    # if any State in the batch doesn't exist, no State is removed
+    with pytest.raises(KripkeStructError) as e:
+        ks.remove_states(["s5", "s6"])
+    assert str(e.value) == "Can't remove a Non-Existing State"
+    with pytest.raises(KripkeStructError) as e:
+        ks.remove_states(["s5", "s5"])
+    assert str(e.value) == "Can't remove a Non-Existing State"
+    assert "s5" in ks.get_state_names()
     assert ks.get_states() == {
         "s1": 0b1000,  # s1 has labels "a"
         "s2": 0b1100,  # s2 has labels "a", "b"
@@ -284,6 +329,9 @@ def test_KS_set_starts():
     with pytest.raises(KripkeStructError) as error_info:
         ks.set_starts(["s5"])
     assert str(error_info.value) == "Can't set a Non-Existing State as Start State"
+    with pytest.raises(KripkeStructError) as error_info:
+        ks.set_starts([1])
+    assert str(error_info.value) == "Can't set a Non-Existing State as Start State"
 
 
 def test_KS_get_starts():
@@ -337,6 +385,17 @@ def test_KS_add_trans():
         ks.add_trans(trans)
     assert str(error_info.value) == "Can't add Transition to a Non-Existing Target State"
 
+    # if any transition is invalid, no transition is added
+    with pytest.raises(KripkeStructError) as error_info:
+        trans = {"s1": ["s3", "s7"]}
+        ks.add_trans(trans)
+    assert ks._trans["s1"] == {"s2"}
+
+    # the Target States can be any iterable, even a one-shot one like a generator
+    ks.add_trans({"s4": (next_state for next_state in ["s1"])})
+    assert ks._trans["s4"] == {"s1", "s2"}
+    assert ks._trans_inverted["s1"] == {"s3", "s4"}
+
 
 def test_KS_get_trans():
     ks = KripkeStruct()
@@ -411,6 +470,21 @@ def test_KS_remove_trans():
         ks.remove_trans({"s2": ["s4"]})
     assert str(error_info.value) == "Can't remove a Non-Existing Transition"
 
+    # if any Transition in the batch doesn't exist, or is listed twice, no Transition is removed
+    # so the cached Predecessor Masks still match the Transitions
+    ks._ensure_masks()
+    assert ks._pred_masks == [0b0100, 0b0001, 0b0010, 0b0100]
+    with pytest.raises(KripkeStructError) as error_info:
+        ks.remove_trans({"s1": ["s2"], "s2": ["s4"]})
+    assert str(error_info.value) == "Can't remove a Non-Existing Transition"
+    with pytest.raises(KripkeStructError) as error_info:
+        ks.remove_trans({"s3": ["s4", "s4"]})
+    assert str(error_info.value) == "Can't remove a Non-Existing Transition"
+    assert ks.get_trans() == {"s1": {"s2"}, "s2": {"s3"}, "s3": {"s4", "s1"}, "s4": set()}
+    assert ks.get_trans_inverted() == {"s1": {"s3"}, "s2": {"s1"}, "s3": {"s2"}, "s4": {"s3"}}
+    ks._ensure_masks()
+    assert ks._pred_masks == [0b0100, 0b0001, 0b0010, 0b0100]
+
 
 def test_KS_reverse_all_trans():
     ks = KripkeStruct()
@@ -465,16 +539,149 @@ def test_KS_get_SCCs():
     SCC_3 = frozenset({"s3"})
     SCC_4 = frozenset({"s4"})
     SCC_5 = frozenset({"s5", "s6", "s7"})
-    assert ks.get_SCCs() == {SCC_1, SCC_2, SCC_3, SCC_4, SCC_5}
+    assert set(ks.get_SCCs()) == {SCC_1, SCC_2, SCC_3, SCC_4, SCC_5}
+
+    # the SCCs are cached until the Kripke Structure is modified
+    SCC_masks = ks._SCC_masks
+    assert set(ks.get_SCCs()) == {SCC_1, SCC_2, SCC_3, SCC_4, SCC_5}
+    assert ks._SCC_masks is SCC_masks
+
+    # the SCCs are in reverse topological order
+    SCCs = ks.get_SCCs()
+    assert SCCs.index(SCC_5) < SCCs.index(SCC_4) < SCCs.index(SCC_3) < SCCs.index(SCC_2) < SCCs.index(SCC_1)
 
     ks.add_trans({"s4": ["s2"]})
     SCC_6 = frozenset({"s2", "s3", "s4"})
-    assert ks.get_SCCs() == {SCC_1, SCC_6, SCC_5}
+    assert set(ks.get_SCCs()) == {SCC_1, SCC_6, SCC_5}
 
     ks.remove_states(["s3", "s4", "s6"])
     SCC_7 = frozenset({"s5"})
     SCC_8 = frozenset({"s7"})
-    assert ks.get_SCCs() == {SCC_1, SCC_2, SCC_7, SCC_8}
+    assert set(ks.get_SCCs()) == {SCC_1, SCC_2, SCC_7, SCC_8}
+
+
+def test_KS_get_reachable_states():
+    ks_json = {
+        "Atoms": ["a", "b", "c", "d"],
+        "States": {
+            "s1": ["a"],
+            "s2": ["a", "b"],
+            "s3": ["b", "c"],
+            "s4": ["b", "c", "d"],
+            "s5": ["b"],
+            "s6": ["c"],
+            "s7": ["d"],
+        },
+        "Starts": ["s1"],
+        "Trans": {
+            's1': ['s2'],
+            's2': ['s3', 's4'],
+            's3': ['s4'],
+            's5': ['s6'],
+            's6': ['s7', 's5'],
+            's7': ['s5'],
+        },
+    }
+    ks = KripkeStruct(ks_json)
+
+    # by default, search from the Start States
+    assert ks.get_reachable_states() == {"s1", "s2", "s3", "s4"}
+    assert ks.get_reachable_states(["s3", "s7"]) == {"s3", "s4", "s5", "s6", "s7"}
+    assert ks.get_reachable_states([]) == set()
+
+    ks.add_trans({"s4": ["s7"]})
+    assert ks.get_reachable_states() == {"s1", "s2", "s3", "s4", "s5", "s6", "s7"}
+
+    # can't search from a Non-Existing State
+    with pytest.raises(KripkeStructError) as e:
+        ks.get_reachable_states(["s8"])
+    assert str(e.value) == "Can't search from a Non-Existing State"
+
+
+def test_KS_has_path():
+    ks_json = {
+        "Atoms": ["a", "b", "c", "d"],
+        "States": {
+            "s1": ["a"],
+            "s2": ["a", "b"],
+            "s3": ["b", "c"],
+            "s4": ["b", "c", "d"],
+            "s5": ["b"],
+            "s6": ["c"],
+            "s7": ["d"],
+        },
+        "Starts": ["s1"],
+        "Trans": {
+            's1': ['s2'],
+            's2': ['s3', 's4'],
+            's3': ['s4'],
+            's5': ['s6'],
+            's6': ['s7', 's5'],
+            's7': ['s5'],
+        },
+    }
+    ks = KripkeStruct(ks_json)
+    assert ks.has_path("s1", "s1")
+    assert ks.has_path("s1", "s4")
+    assert ks.has_path("s5", "s7")
+    assert ks.has_path("s7", "s6")
+    assert not ks.has_path("s4", "s1")
+    assert not ks.has_path("s1", "s5")
+
+    ks.add_trans({"s4": ["s7"]})
+    assert ks.has_path("s1", "s5")
+
+    # can't find a Path from or to a Non-Existing State
+    with pytest.raises(KripkeStructError) as e:
+        ks.has_path("s1", "s8")
+    assert str(e.value) == "Can't find a Path from or to a Non-Existing State"
+
+
+def test_KS_states_copy():
+    ks = KripkeStruct()
+    ks.set_atoms(["a", "b"])
+    ks.add_states({"s1": ["a"], "s2": ["b"]})
+
+    # a copy of the States is independent of the original one, including the State Labels in use
+    for states in (ks._states.copy(), copy(ks._states)):
+        assert states == {"s1": 0b10, "s2": 0b01}
+        del states["s1"]
+        states["s3"] = 0b10
+        assert states == {"s2": 0b01, "s3": 0b10}
+        assert ks.get_states() == {"s1": 0b10, "s2": 0b01}
+        with pytest.raises(KripkeStructError) as e:
+            ks._states["s3"] = 0b10
+        assert str(e.value) == "Can't assign an existing State Label to a different State Name"
+
+
+def test_KS_clone():
+    ks = KripkeStruct()
+    ks.set_atoms(["a", "b"])
+    ks.add_states({"s1": ["a"], "s2": ["b"]})
+    ks.set_starts(["s1"])
+    ks.add_trans({"s1": ["s2"], "s2": ["s1"]})
+    ks.get_SCCs()
+
+    tmp_ks = ks.clone()
+    assert str(tmp_ks) == str(ks)
+    assert tmp_ks.get_trans_inverted() == ks.get_trans_inverted()
+    assert set(tmp_ks.get_SCCs()) == {frozenset({"s1", "s2"})}
+
+    # modifying the clone won't affect the original one
+    tmp_ks.remove_trans({"s2": ["s1"]})
+    tmp_ks.add_state("s3", [])
+    tmp_ks.set_starts(["s3"])
+    assert ks.get_trans() == {"s1": {"s2"}, "s2": {"s1"}}
+    assert ks.get_trans_inverted() == {"s1": {"s2"}, "s2": {"s1"}}
+    assert ks.get_state_names() == {"s1", "s2"}
+    assert ks.get_starts() == {"s1"}
+    assert set(ks.get_SCCs()) == {frozenset({"s1", "s2"})}
+    assert set(tmp_ks.get_SCCs()) == {frozenset({"s1"}), frozenset({"s2"}), frozenset({"s3"})}
+
+    # the State Labels of the clone are still validated
+    with pytest.raises(KripkeStructError) as error_info:
+        tmp_ks._states["s3"] = 0b10
+    assert str(error_info.value) == "Can't assign an existing State Label to a different State Name"
 
 
 # Integration Tests: removing state will remove related transitions
@@ -501,3 +708,75 @@ def test_KS_remove_states_will_remove_related_trans():
     ks.remove_state("s2")
     assert ks.get_trans() == {'s1': set(), 's3': {'s4', 's1'}, 's4': set()}
     assert ks.get_trans_inverted() == {'s3': set(), 's4': {'s3'}, 's1': {'s3'}}
+
+
+# Tests for the cached State Masks
+def test_KS_state_masks():
+    ks = KripkeStruct()
+    ks.set_atoms(["a", "b"])
+    ks.add_states({"s1": ["a"], "s2": ["b"], "s3": []})
+    ks._ensure_masks()
+    assert ks._state_names == ("s1", "s2", "s3")
+    assert ks._all_mask == 0b111
+    assert ks._to_mask({"s1", "s3"}) == 0b101
+    assert ks._to_states(0b110) == {"s2", "s3"}
+    assert ks._atom_masks == {"a": 0b001, "b": 0b010}
+
+    # setting a State Label will rebuild the Atom Masks
+    ks.set_label_of_state("s3", {"a", "b"})
+    ks._ensure_masks()
+    assert ks._atom_masks == {"a": 0b101, "b": 0b110}
+
+    # assigning a State Label with [] will also rebuild the Atom Masks
+    ks._states["s3"] = 0b00
+    ks._ensure_masks()
+    assert ks._atom_masks == {"a": 0b001, "b": 0b010}
+
+    # adding Transitions will rebuild the Predecessor Masks
+    ks.add_trans({"s1": ["s2", "s3"], "s2": ["s1"]})
+    ks._ensure_masks()
+    assert ks._pred_masks == [0b010, 0b001, 0b001]
+
+    # removing a State will rebuild the State Masks
+    ks.remove_state("s2")
+    ks._ensure_masks()
+    assert ks._all_mask == 0b11
+    assert ks._pred_masks == [0b00, 0b01]
+    assert ks._to_states(ks._to_mask({"s1", "s3"})) == {"s1", "s3"}
+
+    # if a State doesn't exist, it's ignored when converting to a State Mask
+    assert ks._to_mask({"s2"}) == 0
+    assert ks._to_mask({"s1", "s2"}) == 0b01
+
+
+def test_KS_mutators_invalidate_masks():
+    ks = KripkeStruct()
+
+    def assert_invalidated(mutate):
+        ks._ensure_masks()
+        assert not (ks._dirty or ks._states.modified)
+        mutate()
+        assert ks._dirty or ks._states.modified
+
+    # every mutator that the cached State Masks depend on must invalidate them
+    assert_invalidated(lambda: ks.set_atoms(["a", "b"]))
+    assert_invalidated(lambda: ks.add_state("s1", ["a"]))
+    assert_invalidated(lambda: ks.add_states({"s2": ["b"], "s3": []}))
+    assert_invalidated(lambda: ks.set_label_of_state("s3", {"a", "b"}))
+    assert_invalidated(lambda: ks.add_trans({"s1": ["s2", "s3"], "s2": ["s1"]}))
+    assert_invalidated(lambda: ks.remove_trans({"s1": ["s3"]}))
+    assert_invalidated(lambda: ks.reverse_all_trans())
+    assert_invalidated(lambda: ks.remove_state("s3"))
+    assert_invalidated(lambda: ks.remove_states(["s2"]))
+
+
+def test_KS_get_SCC_masks():
+    ks = KripkeStruct()
+    ks.set_atoms(["a", "b", "c"])
+    ks.add_states({"s1": ["a"], "s2": ["b"], "s3": ["c"], "s4": []})
+    ks.add_trans({"s1": ["s2"], "s2": ["s1", "s3"], "s3": ["s4"], "s4": ["s3"]})
+    ks._ensure_masks()
+    assert set(ks._get_SCC_masks(ks._all_mask)) == {0b0011, 0b1100}
+
+    # only States in the State Mask (and Transitions between them) are considered
+    assert set(ks._get_SCC_masks(0b0111)) == {0b0011, 0b0100}